@@ -5,17 +5,99 @@ Supports RemoteStartTransaction and sends real-time charging data
 """
 
 import asyncio
-import json
-import uuid
+import logging
+import logging.handlers
+import queue
+import random
+import threading
+import time
 import websockets
-from datetime import datetime, timezone
 from enum import Enum
 from typing import Optional
 import sys
 
+# Frames are encoded to UTF-8 bytes and sent as text frames (OCPP-J requires text)
+try:
+    import orjson
+
+    _dumps = orjson.dumps
+    _loads = orjson.loads
+except ImportError:
+    import json
+
+    def _dumps(obj) -> bytes:
+        return json.dumps(obj, separators=(",", ":")).encode()
+
+    _loads = json.loads
+
+
+# Module-level bindings skip the time.<attr> lookups on every timestamp
+_time = time.time
+_gmtime = time.gmtime
+_strftime = time.strftime
+
+
+def _utcnow_iso() -> str:
+    """Current UTC time as an OCPP timestamp with millisecond precision"""
+    t = _time()
+    return _strftime("%Y-%m-%dT%H:%M:%S", _gmtime(t)) + f".{int(t % 1 * 1000):03d}Z"
+
+
 # Set stdout to be line-buffered to prevent blocking
 sys.stdout.reconfigure(line_buffering=True)
 
+# Simulator event output (OCPP frames, status changes, meter summary); CLI replies stay
+# on print(). Goes straight to stdout until setup_logging() moves the writes onto a
+# background thread
+log = logging.getLogger("ocpp_simulator")
+log.setLevel(logging.INFO)
+log.propagate = False
+_stdout_handler = logging.StreamHandler(sys.stdout)
+_stdout_handler.setFormatter(logging.Formatter("%(message)s"))
+log.addHandler(_stdout_handler)
+
+
+# Constant sampledValue fields for MeterValues, in the order values are filled in
+_SV_ENERGY = {
+    "context": "Sample.Periodic",
+    "format": "Raw",
+    "measurand": "Energy.Active.Import.Register",
+    "unit": "Wh"
+}
+_SV_CURRENT = {
+    "context": "Sample.Periodic",
+    "format": "Raw",
+    "measurand": "Current.Import",
+    "phase": "L1",
+    "unit": "A"
+}
+_SV_VOLTAGE = {
+    "context": "Sample.Periodic",
+    "format": "Raw",
+    "measurand": "Voltage",
+    "phase": "L1",
+    "unit": "V"
+}
+_SV_POWER = {
+    "context": "Sample.Periodic",
+    "format": "Raw",
+    "measurand": "Power.Active.Import",
+    "unit": "W"
+}
+_SV_SOC = {
+    "context": "Sample.Periodic",
+    "format": "Raw",
+    "measurand": "SoC",
+    "unit": "Percent"
+}
+_SAMPLED_VALUES = (_SV_ENERGY, _SV_CURRENT, _SV_VOLTAGE, _SV_POWER, _SV_SOC)
+
+# Max MeterValues samples coalesced into one frame while the socket write buffer is backed up
+_MV_MAX_BATCH = 6
+
+# Charging current factor above 80% SoC, indexed by whole percent (80..100)
+_CHARGING_TAPER = tuple(max(0.2, (100 - soc) / 20) for soc in range(80, 101))
+
 
 class ChargePointStatus(Enum):
     AVAILABLE = "Available"
@@ -53,10 +135,12 @@ class OCPP16ChargePoint:
         self.charge_point_id = charge_point_id
         self.central_system_url = central_system_url
         self.websocket = None
+        self._ws_send = None  # websocket.send, bound in connect()
         self.status = ChargePointStatus.AVAILABLE
         self.error_code = ChargePointErrorCode.NO_ERROR
         self.connector_id = 1
         self.transaction_id: Optional[int] = None
+        self._tx_ready = asyncio.Event()  # Set when StartTransaction's transactionId arrives
         self.id_tag: Optional[str] = None
         self.meter_value = 0
         self.charging_current = 16.0  # Default charging current
@@ -66,38 +150,70 @@ class OCPP16ChargePoint:
         self.battery_soc = 20.0  # Start with 20% battery
         self.auto_stop_at_full = True  # Auto stop when battery is 100%
         self.verbose_logging = False  # Detailed OCPP message logging
-        self.message_queue = asyncio.Queue()
+        self._mv_template: Optional[dict] = None  # MeterValues payload reused across ticks
+        self._pending_mv: list = []  # meterValue entries held back under backpressure
+        self._msg_seq = 0  # Call unique_id counter (only needs to be unique per connection)
+        self._noise = tuple(random.uniform(-0.5, 0.5) for _ in range(64))  # Current jitter ring buffer
+        self._noise_i = 0
+        # Central System initiated actions -> handler returning the CallResult payload
+        self._call_handlers = {
+            "RemoteStartTransaction": self.handle_remote_start_transaction,
+            "RemoteStopTransaction": self.handle_remote_stop_transaction,
+            "Reset": self.handle_reset,
+            "ChangeConfiguration": self.handle_change_configuration
+        }
+        self._cli_queue: asyncio.Queue = asyncio.Queue()  # stdin lines from the reader thread (None on EOF)
+        self._stdin_thread: Optional[threading.Thread] = None
+        # BootNotification payload is static for the charge point, so encode it once
+        self._boot_notification_json = _dumps({
+            "chargePointVendor": "SimulatorVendor",
+            "chargePointModel": "Simulator-1.0",
+            "chargePointSerialNumber": f"SIM-{charge_point_id}",
+            "firmwareVersion": "1.0.0",
+            "iccid": "",
+            "imsi": "",
+            "meterType": "SmartMeter",
+            "meterSerialNumber": "METER-001"
+        })
         
     async def connect(self):
         """Connect to Central System"""
         url = f"{self.central_system_url}/{self.charge_point_id}"
-        print(f"🔌 Connecting to Central System: {url}")
+        log.info("🔌 Connecting to Central System: %s", url)
         
         try:
             self.websocket = await websockets.connect(
                 url,
-                subprotocols=["ocpp1.6"]
+                subprotocols=["ocpp1.6"],
+                compression=None,  # OCPP frames are tiny; deflate costs more CPU than it saves
+                max_size=65536,
+                ping_interval=None  # Liveness is covered by OCPP Heartbeat
             )
-            print(f"✅ Connected to Central System")
+            self._ws_send = self.websocket.send  # Bound once, used for every outgoing frame
+            log.info("✅ Connected to Central System")
             return True
         except Exception as e:
-            print(f"❌ Connection failed: {e}")
+            log.error("❌ Connection failed: %s", e)
             return False
     
+    def _next_id(self) -> str:
+        """Next Call unique_id"""
+        self._msg_seq += 1
+        return str(self._msg_seq)
+    
     async def send_message(self, message: list):
         """Send OCPP message"""
-        message_json = json.dumps(message)
-        # Print to stdout in non-blocking way (only in verbose mode)
+        await self.send_raw(_dumps(message))
+    
+    async def send_raw(self, message_json: bytes):
+        """Send already encoded OCPP message"""
         if self.verbose_logging:
-            try:
-                print(f"📤 Sending: {message_json}", flush=True)
-            except BlockingIOError:
-                pass  # Ignore if stdout is blocked
-        await self.websocket.send(message_json)
+            log.info("📤 Sending: %s", message_json.decode())
+        await self._ws_send(message_json, text=True)
     
     async def send_call(self, action: str, payload: dict) -> str:
         """Send OCPP Call message"""
-        unique_id = str(uuid.uuid4())
+        unique_id = self._next_id()
         message = [2, unique_id, action, payload]
         await self.send_message(message)
         return unique_id
@@ -114,17 +230,7 @@ class OCPP16ChargePoint:
     
     async def send_boot_notification(self):
         """Send BootNotification"""
-        payload = {
-            "chargePointVendor": "SimulatorVendor",
-            "chargePointModel": "Simulator-1.0",
-            "chargePointSerialNumber": f"SIM-{self.charge_point_id}",
-            "firmwareVersion": "1.0.0",
-            "iccid": "",
-            "imsi": "",
-            "meterType": "SmartMeter",
-            "meterSerialNumber": "METER-001"
-        }
-        await self.send_call("BootNotification", payload)
+        await self.send_raw(b'[2,"%s","BootNotification",%s]' % (self._next_id().encode(), self._boot_notification_json))
     
     async def send_status_notification(self, status: ChargePointStatus, error_code: ChargePointErrorCode = ChargePointErrorCode.NO_ERROR):
         """Send StatusNotification"""
@@ -135,11 +241,11 @@ class OCPP16ChargePoint:
             "connectorId": self.connector_id,
             "errorCode": error_code.value,
             "status": status.value,
-            "timestamp": datetime.now(timezone.utc).isoformat().replace('+00:00', 'Z')
+            "timestamp": _utcnow_iso()
         }
         
         await self.send_call("StatusNotification", payload)
-        print(f"📊 Status changed: {status.value}")
+        log.info("📊 Status changed: %s", status.value)
     
     async def send_start_transaction(self, id_tag: str):
         """Send StartTransaction"""
@@ -147,20 +253,20 @@ class OCPP16ChargePoint:
             "connectorId": self.connector_id,
             "idTag": id_tag,
             "meterStart": self.meter_value,
-            "timestamp": datetime.now(timezone.utc).isoformat().replace('+00:00', 'Z')
+            "timestamp": _utcnow_iso()
         }
         await self.send_call("StartTransaction", payload)
     
     async def send_stop_transaction(self, reason: str = "Local"):
         """Send StopTransaction"""
         if self.transaction_id is None:
-            print("⚠️  No active transaction to stop")
+            log.warning("⚠️  No active transaction to stop")
             return
         
         payload = {
             "transactionId": self.transaction_id,
             "meterStop": self.meter_value,
-            "timestamp": datetime.now(timezone.utc).isoformat().replace('+00:00', 'Z'),
+            "timestamp": _utcnow_iso(),
             "reason": reason
         }
         
@@ -169,88 +275,72 @@ class OCPP16ChargePoint:
         
         await self.send_call("StopTransaction", payload)
     
-    async def send_meter_values(self):
-        """Send MeterValues with current charging data"""
-        if self.transaction_id is None:
-            return
-        
-        timestamp = datetime.now(timezone.utc).isoformat().replace('+00:00', 'Z')
-        
-        payload = {
+    def build_meter_values_template(self):
+        """Build MeterValues payload once per transaction (only values change per tick)"""
+        self._mv_template = {
             "connectorId": self.connector_id,
             "transactionId": self.transaction_id,
             "meterValue": [
                 {
-                    "timestamp": timestamp,
-                    "sampledValue": [
-                        {
-                            "value": str(self.meter_value),
-                            "context": "Sample.Periodic",
-                            "format": "Raw",
-                            "measurand": "Energy.Active.Import.Register",
-                            "unit": "Wh"
-                        },
-                        {
-                            "value": f"{self.charging_current:.2f}",
-                            "context": "Sample.Periodic",
-                            "format": "Raw",
-                            "measurand": "Current.Import",
-                            "phase": "L1",
-                            "unit": "A"
-                        },
-                        {
-                            "value": f"{self.charging_voltage:.2f}",
-                            "context": "Sample.Periodic",
-                            "format": "Raw",
-                            "measurand": "Voltage",
-                            "phase": "L1",
-                            "unit": "V"
-                        },
-                        {
-                            "value": f"{self.charging_power:.2f}",
-                            "context": "Sample.Periodic",
-                            "format": "Raw",
-                            "measurand": "Power.Active.Import",
-                            "unit": "W"
-                        },
-                        {
-                            "value": f"{self.battery_soc:.1f}",
-                            "context": "Sample.Periodic",
-                            "format": "Raw",
-                            "measurand": "SoC",
-                            "unit": "Percent"
-                        }
-                    ]
+                    "timestamp": None,
+                    "sampledValue": [sv.copy() for sv in _SAMPLED_VALUES]
                 }
             ]
         }
+    
+    async def send_meter_values(self):
+        """Send MeterValues with current charging data"""
+        if self.transaction_id is None or self._mv_template is None:
+            return
+        
+        payload = self._mv_template
+        meter_value = payload["meterValue"][0]
+        sampled_value = meter_value["sampledValue"]
+        meter_value["timestamp"] = _utcnow_iso()
+        energy, current, voltage, power, soc = ("%d %.2f %.2f %.2f %.1f" % (
+            self.meter_value, self.charging_current, self.charging_voltage,
+            self.charging_power, self.battery_soc)).split()
+        sampled_value[0]["value"] = energy
+        sampled_value[1]["value"] = current
+        sampled_value[2]["value"] = voltage
+        sampled_value[3]["value"] = power
+        sampled_value[4]["value"] = soc
+        log.info("⚡ Meter: %sWh | Current: %sA | Power: %sW | Battery: %s%%", energy, current, power, soc)
+        
+        # If the previous frames haven't drained yet, hold samples and send them as one frame
+        transport = getattr(self.websocket, "transport", None)
+        backed_up = transport is not None and transport.get_write_buffer_size() > 0
+        if backed_up or self._pending_mv:
+            self._pending_mv.append({
+                "timestamp": meter_value["timestamp"],
+                "sampledValue": [sv.copy() for sv in sampled_value]
+            })
+            if backed_up and len(self._pending_mv) < _MV_MAX_BATCH:
+                return
+            payload = {**payload, "meterValue": self._pending_mv}
+            self._pending_mv = []
         
         await self.send_call("MeterValues", payload)
-        # Print to stdout in non-blocking way
-        try:
-            print(f"⚡ Meter: {self.meter_value}Wh | Current: {self.charging_current:.2f}A | Power: {self.charging_power:.2f}W | Battery: {self.battery_soc:.1f}%", flush=True)
-        except BlockingIOError:
-            pass  # Ignore if stdout is blocked
     
     async def send_heartbeat(self):
         """Send Heartbeat"""
-        await self.send_call("Heartbeat", {})
+        await self.send_raw(b'[2,"%s","Heartbeat",{}]' % self._next_id().encode())
     
     async def handle_remote_start_transaction(self, payload: dict):
         """Handle RemoteStartTransaction request"""
         connector_id = payload.get("connectorId", 1)
         id_tag = payload["idTag"]
         
-        print(f"🚀 RemoteStartTransaction received for connector {connector_id}, idTag: {id_tag}")
+        log.info("🚀 RemoteStartTransaction received for connector %s, idTag: %s", connector_id, id_tag)
         
         # OCPP 1.6: Only accept RemoteStartTransaction when Available
         if self.status != ChargePointStatus.AVAILABLE:
-            print(f"⚠️  Rejected - connector must be Available (current: {self.status.value})")
+            log.warning("⚠️  Rejected - connector must be Available (current: %s)", self.status.value)
             return {"status": "Rejected"}
         
         # Check if already in transaction
         if self.transaction_id is not None:
-            print(f"⚠️  Rejected - transaction {self.transaction_id} already active")
+            log.warning("⚠️  Rejected - transaction %s already active", self.transaction_id)
             return {"status": "Rejected"}
         
         self.id_tag = id_tag
@@ -268,20 +358,22 @@ class OCPP16ChargePoint:
             await asyncio.sleep(2)
             
             # 2. Send StartTransaction
+            self._tx_ready.clear()
             await self.send_start_transaction(id_tag)
-            await asyncio.sleep(1)
             
             # Wait for transaction ID from response (will be set by message handler)
-            for _ in range(10):
-                if self.transaction_id is not None:
-                    break
-                await asyncio.sleep(0.5)
+            try:
+                await asyncio.wait_for(self._tx_ready.wait(), timeout=5.0)
+            except asyncio.TimeoutError:
+                pass
             
             if self.transaction_id is None:
-                print("⚠️  Transaction ID not received")
+                log.warning("⚠️  Transaction ID not received")
                 await self.send_status_notification(ChargePointStatus.AVAILABLE)
                 return
             
+            self.build_meter_values_template()
+            
             # 3. Change to Charging
             await self.send_status_notification(ChargePointStatus.CHARGING)
             self.is_charging = True
@@ -289,16 +381,14 @@ class OCPP16ChargePoint:
             # Start charging simulation
             asyncio.create_task(self.simulate_charging())
             
-            print(f"✅ Transaction {self.transaction_id} started successfully")
+            log.info("✅ Transaction %s started successfully", self.transaction_id)
             
         except Exception as e:
-            print(f"❌ Error in auto start: {e}")
+            log.error("❌ Error in auto start: %s", e)
             await self.send_status_notification(ChargePointStatus.AVAILABLE)
     
     async def simulate_charging(self):
         """Simulate charging process with meter values"""
-        import random
-        
         # Use current charging_current value (don't reset it)
         # self.charging_current is already set from CLI or default (16A)
         base_charging_current = self.charging_current  # Save the user-set value
@@ -307,26 +397,32 @@ class OCPP16ChargePoint:
         # Battery simulation (assuming ~50kWh battery capacity)
         battery_capacity_wh = 50000  # 50 kWh
         
-        print(f"🔋 Charging started: {self.charging_current:.1f}A @ {self.charging_voltage}V = {self.charging_power:.1f}W | Battery: {self.battery_soc:.1f}%")
-        print(f"   Auto-stop at 100%: {'Enabled' if self.auto_stop_at_full else 'Disabled'}")
+        log.info("🔋 Charging started: %.1fA @ %sV = %.1fW | Battery: %.1f%%", self.charging_current, self.charging_voltage, self.charging_power, self.battery_soc)
+        log.info("   Auto-stop at 100%%: %s", 'Enabled' if self.auto_stop_at_full else 'Disabled')
         
         # Calculate time to full charge
         remaining_capacity = battery_capacity_wh * ((100 - self.battery_soc) / 100)
         time_to_full_hours = remaining_capacity / self.charging_power if self.charging_power > 0 else 0
         time_to_full_minutes = time_to_full_hours * 60
-        print(f"   Estimated time to full: {time_to_full_minutes:.1f} minutes (at {self.charging_current:.1f}A)")
+        log.info("   Estimated time to full: %.1f minutes (at %.1fA)", time_to_full_minutes, self.charging_current)
+        
+        # Per-tick constants, hoisted out of the loop
+        tick_hours = 5 / 3600
+        soc_per_wh = 100 / battery_capacity_wh
+        
+        loop = asyncio.get_running_loop()
+        deadline = loop.time()
         
         while self.is_charging and self.transaction_id is not None:
             # Calculate energy increment based on actual charging power and time interval (5 seconds)
             # Energy (Wh) = Power (W) * Time (hours)
             # For 5 seconds: Energy = Power * (5/3600)
-            energy_increment = self.charging_power * (5 / 3600)
+            energy_increment = self.charging_power * tick_hours
             self.meter_value += int(energy_increment)
             
             # Update battery SoC based on energy added
             # Increment = (energy_added / battery_capacity) * 100
-            soc_increment = (energy_increment / battery_capacity_wh) * 100
-            self.battery_soc += soc_increment
+            self.battery_soc += energy_increment * soc_per_wh
             
             # Check if battery is full
             if self.battery_soc >= 100.0:
@@ -334,27 +430,33 @@ class OCPP16ChargePoint:
                 
                 # Auto stop if enabled
                 if self.auto_stop_at_full:
-                    print("🔋 Battery full (100%) - auto stopping charge")
+                    log.info("🔋 Battery full (100%) - auto stopping charge")
                     await asyncio.sleep(2)
                     await self.auto_stop_transaction("EVDisconnected")
                     break
             
             # Add some variation to current (less current as battery gets fuller)
-            charging_rate = 1.0 if self.battery_soc < 80 else max(0.2, (100 - self.battery_soc) / 20)
-            self.charging_current = (base_charging_current * charging_rate) + random.uniform(-0.5, 0.5)
+            charging_rate = 1.0 if self.battery_soc < 80 else _CHARGING_TAPER[int(self.battery_soc) - 80]
+            self.charging_current = (base_charging_current * charging_rate) + self._noise[self._noise_i & 63]
+            self._noise_i += 1
             if self.charging_current < 0:
                 self.charging_current = 0.5
             self.charging_power = self.charging_current * self.charging_voltage
             
-            # Send meter values every 5 seconds
+            # Send meter values every 5 seconds (deadline based, so send time doesn't drift the schedule)
             await self.send_meter_values()
-            await asyncio.sleep(5)
+            deadline += 5
+            delay = deadline - loop.time()
+            if delay < 0:
+                deadline -= delay  # Fell behind - resync instead of bursting
+                delay = 0
+            await asyncio.sleep(delay)
     
     async def handle_remote_stop_transaction(self, payload: dict):
         """Handle RemoteStopTransaction request"""
         transaction_id = payload["transactionId"]
         
-        print(f"🛑 RemoteStopTransaction received for transaction {transaction_id}")
+        log.info("🛑 RemoteStopTransaction received for transaction %s", transaction_id)
         
         if self.transaction_id != transaction_id:
             return {"status": "Rejected"}
@@ -374,32 +476,48 @@ class OCPP16ChargePoint:
             await self.send_status_notification(ChargePointStatus.FINISHING)
             await asyncio.sleep(2)
             
+            # Flush meter samples held back under backpressure before the transaction ends
+            if self._pending_mv and self._mv_template is not None:
+                await self.send_call("MeterValues", {**self._mv_template, "meterValue": self._pending_mv})
+                self._pending_mv = []
+            
             # 2. Send StopTransaction
             await self.send_stop_transaction(reason)
-            await asyncio.sleep(1)
             
             # 3. Change back to Available
             await self.send_status_notification(ChargePointStatus.AVAILABLE)
             
             self.transaction_id = None
+            self._tx_ready.clear()
             self.id_tag = None
+            self._mv_template = None
             # Don't reset battery SoC - keep current charge level
             
-            print(f"✅ Transaction stopped successfully")
+            log.info("✅ Transaction stopped successfully")
             
         except Exception as e:
-            print(f"❌ Error in auto stop: {e}")
+            log.error("❌ Error in auto stop: %s", e)
+    
+    async def handle_reset(self, payload: dict):
+        """Handle Reset request"""
+        log.info("🔄 Reset accepted")
+        return {"status": "Accepted"}
+    
+    async def handle_change_configuration(self, payload: dict):
+        """Handle ChangeConfiguration request"""
+        return {"status": "Accepted"}
     
     async def handle_message(self, message_text: str):
         """Handle incoming OCPP message"""
         try:
-            message = json.loads(message_text)
-            # Print to stdout in non-blocking way (only in verbose mode)
             if self.verbose_logging:
-                try:
-                    print(f"📥 Received: {message_text}", flush=True)
-                except BlockingIOError:
-                    pass
+                log.info("📥 Received: %s", message_text)
+            
+            # Only StartTransaction's CallResult matters to us; skip parsing the others
+            if message_text[1:2] == "3" and '"transactionId"' not in message_text:
+                return
+            
+            message = _loads(message_text)
             
             message_type = message[0]
             
@@ -408,23 +526,10 @@ class OCPP16ChargePoint:
                 action = message[2]
                 payload = message[3]
                 
-                if action == "RemoteStartTransaction":
-                    result = await self.handle_remote_start_transaction(payload)
-                    await self.send_call_result(unique_id, result)
-                
-                elif action == "RemoteStopTransaction":
-                    result = await self.handle_remote_stop_transaction(payload)
-                    await self.send_call_result(unique_id, result)
-                
-                elif action == "Reset":
-                    result = {"status": "Accepted"}
-                    await self.send_call_result(unique_id, result)
-                    print("🔄 Reset accepted")
-                
-                elif action == "ChangeConfiguration":
-                    result = {"status": "Accepted"}
+                handler = self._call_handlers.get(action)
+                if handler is not None:
+                    result = await handler(payload)
                     await self.send_call_result(unique_id, result)
-                
                 else:
                     await self.send_call_error(unique_id, "NotImplemented", f"Action {action} not implemented")
             
@@ -435,13 +540,14 @@ class OCPP16ChargePoint:
                 # Handle StartTransaction response
                 if "idTagInfo" in payload and "transactionId" in payload:
                     self.transaction_id = payload["transactionId"]
-                    print(f"✅ Transaction ID: {self.transaction_id}")
+                    self._tx_ready.set()
+                    log.info("✅ Transaction ID: %s", self.transaction_id)
             
             elif message_type == 4:  # CALLERROR
-                print(f"❌ Error received: {message}")
+                log.error("❌ Error received: %s", message)
         
         except Exception as e:
-            print(f"❌ Error handling message: {e}")
+            log.error("❌ Error handling message: %s", e)
     
     async def message_receiver(self):
         """Receive messages from Central System"""
@@ -449,9 +555,9 @@ class OCPP16ChargePoint:
             async for message in self.websocket:
                 await self.handle_message(message)
         except websockets.exceptions.ConnectionClosed:
-            print("⚠️  Connection closed")
+            log.warning("⚠️  Connection closed")
         except Exception as e:
-            print(f"❌ Receiver error: {e}")
+            log.error("❌ Receiver error: %s", e)
     
     async def heartbeat_loop(self):
         """Send periodic heartbeats"""
@@ -460,9 +566,24 @@ class OCPP16ChargePoint:
             try:
                 await self.send_heartbeat()
             except Exception as e:
-                print(f"❌ Heartbeat error: {e}")
+                log.error("❌ Heartbeat error: %s", e)
                 break
     
+    def _stdin_pump(self, loop: asyncio.AbstractEventLoop):
+        """Read stdin lines on a worker thread and hand them to the event loop"""
+        try:
+            for raw in sys.stdin.buffer:
+                line = raw.decode(sys.stdin.encoding or "utf-8", errors="replace")
+                loop.call_soon_threadsafe(self._cli_queue.put_nowait, line)
+        except RuntimeError:
+            pass  # Event loop already closed
+        finally:
+            # Any exit of this thread reaches the CLI as EOF
+            try:
+                loop.call_soon_threadsafe(self._cli_queue.put_nowait, None)
+            except RuntimeError:
+                pass
+    
     async def cli_control_panel(self):
         """CLI control panel for manual status changes"""
         print("\n" + "="*60)
@@ -482,147 +603,150 @@ class OCPP16ChargePoint:
         print("  quit                - Exit simulator")
         print("="*60 + "\n")
         
-        try:
-            from aioconsole import ainput
-            
-            while True:
-                try:
-                    cmd = await ainput(">>> ")
-                    cmd = cmd.strip()
-                    
-                    if not cmd:
+        if self._stdin_thread is None:
+            self._stdin_thread = threading.Thread(
+                target=self._stdin_pump,
+                args=(asyncio.get_running_loop(),),
+                daemon=True
+            )
+            self._stdin_thread.start()
+        
+        while True:
+            try:
+                print(">>> ", end="", flush=True)
+                cmd = await self._cli_queue.get()
+                if cmd is None:  # stdin closed
+                    break
+                cmd = cmd.strip()
+                
+                if not cmd:
+                    continue
+                
+                parts = cmd.split(maxsplit=1)
+                command = parts[0].lower()
+                arg = parts[1] if len(parts) > 1 else None
+                
+                if command == "quit" or command == "exit":
+                    print("👋 Exiting...")
+                    await self.auto_stop_transaction("Local")
+                    break
+                
+                elif command == "status":
+                    if not arg:
+                        print("Usage: status <status_name>")
                         continue
-                    
-                    parts = cmd.split(maxsplit=1)
-                    command = parts[0].lower()
-                    arg = parts[1] if len(parts) > 1 else None
-                    
-                    if command == "quit" or command == "exit":
-                        print("👋 Exiting...")
-                        await self.auto_stop_transaction("Local")
-                        break
-                    
-                    elif command == "status":
-                        if not arg:
-                            print("Usage: status <status_name>")
-                            continue
-                        try:
-                            status = ChargePointStatus[arg.upper().replace(" ", "_")]
-                            await self.send_status_notification(status)
-                        except KeyError:
-                            print(f"Invalid status. Options: {', '.join([s.name for s in ChargePointStatus])}")
-                    
-                    elif command == "error":
-                        if not arg:
-                            print("Usage: error <error_code>")
-                            continue
-                        try:
-                            error = ChargePointErrorCode[arg.upper().replace(" ", "_")]
-                            await self.send_status_notification(self.status, error)
-                        except KeyError:
-                            print(f"Invalid error code. Options: {', '.join([e.name for e in ChargePointErrorCode])}")
-                    
-                    elif command == "start":
-                        if not arg:
-                            print("Usage: start <idTag>")
-                            continue
-                        await self.auto_start_transaction(arg)
-                    
-                    elif command == "stop":
-                        await self.auto_stop_transaction("Local")
-                    
-                    elif command == "current":
-                        if not arg:
-                            print("Usage: current <amps>")
-                            continue
-                        try:
-                            new_current = float(arg)
-                            self.charging_current = new_current
-                            self.charging_power = self.charging_current * self.charging_voltage
-                            
-                            # Calculate time to full
-                            battery_capacity_wh = 50000
-                            remaining_capacity = battery_capacity_wh * ((100 - self.battery_soc) / 100)
-                            time_to_full_hours = remaining_capacity / self.charging_power if self.charging_power > 0 else 0
-                            time_to_full_minutes = time_to_full_hours * 60
-                            
-                            print(f"⚡ Current set to {self.charging_current:.1f}A")
-                            print(f"   Power: {self.charging_power:.1f}W")
-                            print(f"   Time to full from {self.battery_soc:.1f}%: {time_to_full_minutes:.1f} minutes")
-                        except ValueError:
-                            print("Invalid current value")
-                    
-                    elif command == "soc":
-                        if not arg:
-                            print("Usage: soc <percent>")
-                            continue
-                        try:
-                            soc = float(arg)
-                            if 0 <= soc <= 100:
-                                self.battery_soc = soc
-                                print(f"🔋 Battery SoC set to {self.battery_soc:.1f}%")
-                            else:
-                                print("SoC must be between 0 and 100")
-                        except ValueError:
-                            print("Invalid SoC value")
-                    
-                    elif command == "autostop":
-                        if not arg:
-                            print(f"Auto-stop at 100%: {'Enabled' if self.auto_stop_at_full else 'Disabled'}")
-                            print("Usage: autostop <on|off>")
-                            continue
-                        if arg.lower() in ['on', 'true', '1', 'yes']:
-                            self.auto_stop_at_full = True
-                            print("✅ Auto-stop at 100% enabled")
-                        elif arg.lower() in ['off', 'false', '0', 'no']:
-                            self.auto_stop_at_full = False
-                            print("⚠️  Auto-stop at 100% disabled")
-                        else:
-                            print("Usage: autostop <on|off>")
-                    
-                    elif command == "verbose":
-                        if not arg:
-                            print(f"Verbose logging: {'Enabled' if self.verbose_logging else 'Disabled'}")
-                            print("Usage: verbose <on|off>")
-                            continue
-                        if arg.lower() in ['on', 'true', '1', 'yes']:
-                            self.verbose_logging = True
-                            print("✅ Verbose logging enabled - will show all OCPP messages")
-                        elif arg.lower() in ['off', 'false', '0', 'no']:
-                            self.verbose_logging = False
-                            print("✅ Verbose logging disabled - showing summary only")
+                    try:
+                        status = ChargePointStatus[arg.upper().replace(" ", "_")]
+                        await self.send_status_notification(status)
+                    except KeyError:
+                        print(f"Invalid status. Options: {', '.join([s.name for s in ChargePointStatus])}")
+                
+                elif command == "error":
+                    if not arg:
+                        print("Usage: error <error_code>")
+                        continue
+                    try:
+                        error = ChargePointErrorCode[arg.upper().replace(" ", "_")]
+                        await self.send_status_notification(self.status, error)
+                    except KeyError:
+                        print(f"Invalid error code. Options: {', '.join([e.name for e in ChargePointErrorCode])}")
+                
+                elif command == "start":
+                    if not arg:
+                        print("Usage: start <idTag>")
+                        continue
+                    await self.auto_start_transaction(arg)
+                
+                elif command == "stop":
+                    await self.auto_stop_transaction("Local")
+                
+                elif command == "current":
+                    if not arg:
+                        print("Usage: current <amps>")
+                        continue
+                    try:
+                        new_current = float(arg)
+                        self.charging_current = new_current
+                        self.charging_power = self.charging_current * self.charging_voltage
+                        
+                        # Calculate time to full
+                        battery_capacity_wh = 50000
+                        remaining_capacity = battery_capacity_wh * ((100 - self.battery_soc) / 100)
+                        time_to_full_hours = remaining_capacity / self.charging_power if self.charging_power > 0 else 0
+                        time_to_full_minutes = time_to_full_hours * 60
+                        
+                        print(f"⚡ Current set to {self.charging_current:.1f}A")
+                        print(f"   Power: {self.charging_power:.1f}W")
+                        print(f"   Time to full from {self.battery_soc:.1f}%: {time_to_full_minutes:.1f} minutes")
+                    except ValueError:
+                        print("Invalid current value")
+                
+                elif command == "soc":
+                    if not arg:
+                        print("Usage: soc <percent>")
+                        continue
+                    try:
+                        soc = float(arg)
+                        if 0 <= soc <= 100:
+                            self.battery_soc = soc
+                            print(f"🔋 Battery SoC set to {self.battery_soc:.1f}%")
                         else:
-                            print("Usage: verbose <on|off>")
-                    
-                    elif command == "info":
-                        print(f"\n📊 Current State:")
-                        print(f"  Status: {self.status.value}")
-                        print(f"  Error: {self.error_code.value}")
-                        print(f"  Transaction ID: {self.transaction_id}")
-                        print(f"  ID Tag: {self.id_tag}")
-                        print(f"  Meter: {self.meter_value} Wh")
-                        print(f"  Current: {self.charging_current:.2f} A")
-                        print(f"  Voltage: {self.charging_voltage:.2f} V")
-                        print(f"  Power: {self.charging_power:.2f} W")
-                        print(f"  Battery SoC: {self.battery_soc:.1f} %")
-                        print(f"  Auto-stop at 100%: {'Enabled' if self.auto_stop_at_full else 'Disabled'}")
-                        print(f"  Verbose logging: {'Enabled' if self.verbose_logging else 'Disabled'}")
-                        print(f"  Charging: {self.is_charging}\n")
-                    
-                    elif command == "help":
-                        await self.cli_control_panel()
-                        return
-                    
+                            print("SoC must be between 0 and 100")
+                    except ValueError:
+                        print("Invalid SoC value")
+                
+                elif command == "autostop":
+                    if not arg:
+                        print(f"Auto-stop at 100%: {'Enabled' if self.auto_stop_at_full else 'Disabled'}")
+                        print("Usage: autostop <on|off>")
+                        continue
+                    if arg.lower() in ['on', 'true', '1', 'yes']:
+                        self.auto_stop_at_full = True
+                        print("✅ Auto-stop at 100% enabled")
+                    elif arg.lower() in ['off', 'false', '0', 'no']:
+                        self.auto_stop_at_full = False
+                        print("⚠️  Auto-stop at 100% disabled")
                     else:
-                        print(f"Unknown command: {command}. Type 'help' for commands.")
+                        print("Usage: autostop <on|off>")
                 
-                except EOFError:
-                    break
-                except Exception as e:
-                    print(f"❌ Command error: {e}")
-        
-        except ImportError:
-            print("⚠️  aioconsole not available, CLI disabled")
+                elif command == "verbose":
+                    if not arg:
+                        print(f"Verbose logging: {'Enabled' if self.verbose_logging else 'Disabled'}")
+                        print("Usage: verbose <on|off>")
+                        continue
+                    if arg.lower() in ['on', 'true', '1', 'yes']:
+                        self.verbose_logging = True
+                        print("✅ Verbose logging enabled - will show all OCPP messages")
+                    elif arg.lower() in ['off', 'false', '0', 'no']:
+                        self.verbose_logging = False
+                        print("✅ Verbose logging disabled - showing summary only")
+                    else:
+                        print("Usage: verbose <on|off>")
+                
+                elif command == "info":
+                    print(f"\n📊 Current State:")
+                    print(f"  Status: {self.status.value}")
+                    print(f"  Error: {self.error_code.value}")
+                    print(f"  Transaction ID: {self.transaction_id}")
+                    print(f"  ID Tag: {self.id_tag}")
+                    print(f"  Meter: {self.meter_value} Wh")
+                    print(f"  Current: {self.charging_current:.2f} A")
+                    print(f"  Voltage: {self.charging_voltage:.2f} V")
+                    print(f"  Power: {self.charging_power:.2f} W")
+                    print(f"  Battery SoC: {self.battery_soc:.1f} %")
+                    print(f"  Auto-stop at 100%: {'Enabled' if self.auto_stop_at_full else 'Disabled'}")
+                    print(f"  Verbose logging: {'Enabled' if self.verbose_logging else 'Disabled'}")
+                    print(f"  Charging: {self.is_charging}\n")
+                
+                elif command == "help":
+                    await self.cli_control_panel()
+                    return
+                
+                else:
+                    print(f"Unknown command: {command}. Type 'help' for commands.")
+            
+            except Exception as e:
+                print(f"❌ Command error: {e}")
     
     async def run(self):
         """Run the charge point simulator"""
@@ -655,7 +779,17 @@ class OCPP16ChargePoint:
         if self.websocket:
             await self.websocket.close()
         
-        print("👋 Simulator stopped")
+        log.info("👋 Simulator stopped")
+
+
+def setup_logging() -> logging.handlers.QueueListener:
+    """Route simulator log records through a queue so stdout writes happen off the event loop"""
+    log_queue = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(log_queue, _stdout_handler)
+    log.removeHandler(_stdout_handler)
+    log.addHandler(logging.handlers.QueueHandler(log_queue))
+    listener.start()
+    return listener
 
 
 async def main():
@@ -667,9 +801,22 @@ async def main():
     charge_point_id = sys.argv[1]
     central_system_url = sys.argv[2]
     
-    charge_point = OCPP16ChargePoint(charge_point_id, central_system_url)
-    await charge_point.run()
+    listener = setup_logging()
+    try:
+        charge_point = OCPP16ChargePoint(charge_point_id, central_system_url)
+        await charge_point.run()
+    finally:
+        listener.stop()
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    try:
+        import uvloop
+    except ImportError:
+        asyncio.run(main())
+    else:
+        if sys.version_info >= (3, 12):
+            asyncio.run(main(), loop_factory=uvloop.new_event_loop)
+        else:
+            uvloop.install()
+            asyncio.run(main())